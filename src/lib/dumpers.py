@@ -7,94 +7,98 @@ import math
 
 from src.lib import helper
 
-def reg2str(ir, idx):
-  """Convert absolute register index to register-based string."""
-
-  for r in ir.regs:
-    if r[0] == idx:
-      return f'{r[1]}[{r[2]}]'
-  return '???'
-
 
 def qasm(ir) -> str:
   """Dump IR in qasm format."""
 
-  res = 'OPENQASM 2.0;\n'
+  res = ['OPENQASM 2.0;\n']
   for regs in ir.regset:
-    res += f'qreg {regs[0]}[{regs[1]}];\n'
-  res += '\n'
+    res.append(f'qreg {regs[0]}[{regs[1]}];\n')
+  res.append('\n')
+
+  # Map absolute register index to register-based string once,
+  # instead of searching ir.regs for every gate.
+  reg_map = {r[0]: f'{r[1]}[{r[2]}]' for r in ir.regs}
 
   for op in ir.gates:
     if op.is_gate():
-      res += op.name
+      res.append(op.name)
       if op.val is not None:
-        res += '({})'.format(helper.pi_fractions(op.val))
+        res.append('({})'.format(helper.pi_fractions(op.val)))
       if op.is_single():
-        res += f' {reg2str(ir, op.idx0)};\n'
+        res.append(f' {reg_map.get(op.idx0, "???")};\n')
       if op.is_ctl():
-        res += f' {reg2str(ir, op.ctl)},{reg2str(ir, op.idx1)};\n'
-  return res
+        res.append(f' {reg_map.get(op.ctl, "???")},'
+                   f'{reg_map.get(op.idx1, "???")};\n')
+  return ''.join(res)
 
 
 def libq(ir) -> str:
   """Dump IR to a compilable C++ program with libq."""
 
-  res = ('// This file was generated by qc.dump_to_file()\n\n' +
-         '#include <math.h>\n' +
-         '#include <stdio.h>\n\n' +
-         '#include "libq.h"\n\n' +
-         'int main(int argc, char* argv[]) {\n\n')
+  res = ['// This file was generated by qc.dump_to_file()\n\n',
+         '#include <math.h>\n',
+         '#include <stdio.h>\n\n',
+         '#include "libq.h"\n\n',
+         'int main(int argc, char* argv[]) {\n\n']
 
   total_regs = 0
   for regs in ir.regset:
     total_regs += regs[1]
-  res += f'  libq::qureg* q = libq::new_qureg(0, {total_regs});\n\n'
+  res.append(f'  libq::qureg* q = libq::new_qureg(0, {total_regs});\n\n')
 
   total_regs = 0
   for regs in ir.regset:
     for r in regs[2].val:
       if r == 1:
-        res += f'  libq::x({total_regs}, q);\n'
+        res.append(f'  libq::x({total_regs}, q);\n')
       total_regs += 1
-  res += '\n'
+  res.append('\n')
 
   for op in ir.gates:
 
     if op.is_gate():
-      res += f'  libq::{op.name}('
+      res.append(f'  libq::{op.name}(')
 
       if op.is_single():
-        res += f'{op.idx0}'
+        res.append(f'{op.idx0}')
         if op.val is not None:
-          res += ', {}'.format(helper.pi_fractions(op.val, 'M_PI'))
-        res += ', q);\n'
+          res.append(', {}'.format(helper.pi_fractions(op.val, 'M_PI')))
+        res.append(', q);\n')
 
       if op.is_ctl():
-        res += f'{op.ctl}, {op.idx1}'
+        res.append(f'{op.ctl}, {op.idx1}')
         if op.val is not None:
-          res += ', {}'.format(helper.pi_fractions(op.val, 'M_PI'))
-        res += ', q);\n'
-
-  res += '\n  libq::flush(q);\n'
-  res += '  libq::print_qureg(q);\n'
-  res += '  libq::delete_qureg(q);\n'
-  res += '  return EXIT_SUCCESS;\n'
-  res += '}\n'
-  return res
+          res.append(', {}'.format(helper.pi_fractions(op.val, 'M_PI')))
+        res.append(', q);\n')
+
+  res.append('\n  libq::flush(q);\n')
+  res.append('  libq::print_qureg(q);\n')
+  res.append('  libq::delete_qureg(q);\n')
+  res.append('  return EXIT_SUCCESS;\n')
+  res.append('}\n')
+  return ''.join(res)
 
 
 def cirq(ir) -> str:
   """Dump IR to a Cirq Python file."""
 
-  res = ('# This file was generated by qc.dump_to_file()\n\n' +
-         'import cirq\n' +
-         'import cmath\n' +
-         'from cmath import pi\n' +
-         'import numpy as np\n\n')
+  res = ['# This file was generated by qc.dump_to_file()\n\n',
+         'import cirq\n',
+         'import cmath\n',
+         'from cmath import pi\n',
+         'import numpy as np\n\n']
+
+  # Shared matrices and helpers, to keep the per-gate code short.
+  res.append('def _u1(theta):\n')
+  res.append('  return np.array([(1.0, 0.0), ')
+  res.append('(0.0, cmath.exp(1j * theta))])\n\n')
+  res.append('_cv = np.array([(1+1j, 1-1j), (1-1j, 1+1j)]) * 0.5\n')
+  res.append('_cv_adj = np.conj(_cv.transpose())\n\n')
 
-  res += 'qc = cirq.Circuit()\n\n'
-  res += f'r = cirq.LineQubit.range({ir.nregs})\n'
-  res += '\n'
+  res.append('qc = cirq.Circuit()\n\n')
+  res.append(f'r = cirq.LineQubit.range({ir.nregs})\n')
+  res.append('\n')
 
   op_map = {'h': 'H', 'x': 'X', 'y': 'Y', 'z': 'Z',
             'cx': 'CX', 'cz': 'CZ'}
@@ -102,53 +106,43 @@ def cirq(ir) -> str:
   for op in ir.gates:
     if op.is_gate():
       if op.name == 'u1':
-        res += 'm = np.array([(1.0, 0.0), (0.0, '
-        res += f'cmath.exp(1j * {helper.pi_fractions(op.val)}))])\n'
-        res += f'qc.append(cirq.MatrixGate(m).on(r[{op.idx0}]))\n'
+        res.append(f'qc.append(cirq.MatrixGate(_u1('
+                   f'{helper.pi_fractions(op.val)})).on(r[{op.idx0}]))\n')
         continue
 
       if op.name == 'cu1':
-        res += 'm = np.array([(1.0, 0.0), (0.0, '
-        res += f'cmath.exp(1j * {helper.pi_fractions(op.val)}))])\n'
-        res += ('qc.append(cirq.MatrixGate(m).controlled()' +
-                f'(r[{op.idx0}], r[{op.idx1}]))\n')
+        res.append(f'qc.append(cirq.MatrixGate(_u1('
+                   f'{helper.pi_fractions(op.val)})).controlled()'
+                   f'(r[{op.ctl}], r[{op.idx1}]))\n')
         continue
 
-      if op.name == 'cv':
-        res += 'm = np.array([(1+1j, 1-1j), (1-1j, 1+1j)]) * 0.5\n'
-        res += ('qc.append(cirq.MatrixGate(m).controlled()' +
-                f'(r[{op.idx0}], r[{op.idx1}]))\n')
-        continue
-
-      if op.name == 'cv_adj':
-        res += 'm = np.array([(1+1j, 1-1j), (1-1j, 1+1j)]) * 0.5\n'
-        res += ('qc.append(cirq.MatrixGate(' +
-                'np.conj(m.transpose())).controlled()' +
-                f'(r[{op.idx0}], r[{op.idx1}]))\n')
+      if op.name in ('cv', 'cv_adj'):
+        res.append(f'qc.append(cirq.MatrixGate(_{op.name}).controlled()'
+                   f'(r[{op.ctl}], r[{op.idx1}]))\n')
         continue
 
       op_name = op_map[op.name]
-      res += f'qc.append(cirq.{op_name}('
+      res.append(f'qc.append(cirq.{op_name}(')
 
       if op.is_single():
-        res += f'r[{op.idx0}]'
+        res.append(f'r[{op.idx0}]')
         if op.val is not None:
-          res += ', {}'.format(helper.pi_fractions(op.val))
-        res += '))\n'
+          res.append(', {}'.format(helper.pi_fractions(op.val)))
+        res.append('))\n')
 
       if op.is_ctl():
-        res += f'r[{op.ctl}], r[{op.idx1}]'
+        res.append(f'r[{op.ctl}], r[{op.idx1}]')
         if op.val is not None:
-          res += ', {}'.format(helper.pi_fractions(op.val))
-        res += '))\n'
+          res.append(', {}'.format(helper.pi_fractions(op.val)))
+        res.append('))\n')
 
-  res += 'sim = cirq.Simulator()\n'
-  res += 'print(\'Simulate...\')\n'
-  res += 'result = sim.simulate(qc)\n'
-  res += 'res_str = str(result)\n'
-  res += 'print(res_str.encode(\'utf-8\'))\n'
+  res.append('sim = cirq.Simulator()\n')
+  res.append('print(\'Simulate...\')\n')
+  res.append('result = sim.simulate(qc)\n')
+  res.append('res_str = str(result)\n')
+  res.append('print(res_str.encode(\'utf-8\'))\n')
 
-  return res
+  return ''.join(res)
 
 
 def latex(ir) -> str:
@@ -1,6 +1,7 @@
 # python3
 """Helper functions."""
 
+import functools
 import itertools
 import math
 import numpy as np
@@ -70,28 +71,55 @@ def dump_bloch(x, y, z):
   print('x: {:.2f}, y: {:.2f}, z: {:.2f}'.format(x, y, z))
 
 
+# Lookup table from (rounded) value to denominator frac, for
+# values of the form pi / frac. Used to speed up pi_fractions().
+_PI_FRAC_TABLE = {round(math.pi / frac, 10): frac
+                  for frac in range(-128, 128) if frac}
+
+
 def pi_fractions(val, pi='pi') -> str:
   """Convert a value in fractions of pi."""
 
+  # Angles tend to repeat throughout a circuit (eg., pi/4 for all
+  # T gates), so results are cached. Arrays are not hashable, convert
+  # them to a scalar first.
+  if isinstance(val, np.ndarray):
+    val = val.item()
+  return _pi_fractions(val, pi)
+
+
+# typed=True, so that, eg., 1 and 1.0 are cached (and printed) separately.
+@functools.lru_cache(maxsize=1024, typed=True)
+def _pi_fractions(val, pi) -> str:
+  """Convert a value in fractions of pi, uncached."""
+
   if val is None:
     return ''
   if val == 0:
     return '0'
+
+  def frac_str(pi_multiplier, frac):
+    pi_str = ''
+    if pi_multiplier != 1:
+      pi_str = '{}*'.format(abs(pi_multiplier))
+    if frac == -1:
+      return '-{}{}'.format(pi_str, pi)
+    if frac < 0:
+      return '-{}{}/{}'.format(pi_str, pi, -frac)
+    if frac == 1:
+      return '{}{}'.format(pi_str, pi)
+    return '{}{}/{}'.format(pi_str, pi, frac)
+
+  # Fast path: exact match after rounding.
+  frac = _PI_FRAC_TABLE.get(round(val, 10))
+  if frac is not None and math.isclose(val, math.pi / frac):
+    return frac_str(1, frac)
+
+  # Slow path, for values which differ in the last few digits.
   for pi_multiplier in range(1, 2):
     for frac in range(-128, 128):
       if frac and math.isclose(val, pi_multiplier * math.pi / frac):
-        pi_str = ''
-        if pi_multiplier != 1:
-          pi_str = '{}*'.format(abs(pi_multiplier))
-        if frac == -1:
-          return '-{}{}'.format(pi_str, pi)
-        if frac < 0:
-          return '-{}{}/{}'.format(pi_str, pi, -frac)
-        if frac == 1:
-          return '{}{}'.format(pi_str, pi)
-        return '{}{}/{}'.format(pi_str, pi, frac)
+        return frac_str(pi_multiplier, frac)
 
   # couldn't find fractional, just return original value.
   return f'{val}'
-
-
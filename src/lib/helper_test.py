@@ -61,5 +61,19 @@ class HelpersTest(absltest.TestCase):
     self.assertEqual(helper.bits2frac((1, 0), 2), 0.5)
     self.assertEqual(helper.bits2frac((1, 1), 2), 0.75)
 
+  def test_pi_fractions(self):
+    self.assertEqual(helper.pi_fractions(None), '')
+    self.assertEqual(helper.pi_fractions(0), '0')
+    self.assertEqual(helper.pi_fractions(math.pi), 'pi')
+    self.assertEqual(helper.pi_fractions(-math.pi), '-pi')
+    self.assertEqual(helper.pi_fractions(math.pi / 4), 'pi/4')
+    self.assertEqual(helper.pi_fractions(-math.pi / 3, 'M_PI'), '-M_PI/3')
+    # Misses the (rounded) lookup table, but is still close to pi/4.
+    self.assertEqual(helper.pi_fractions(math.pi / 4 * (1 + 5e-10)), 'pi/4')
+    self.assertEqual(helper.pi_fractions(0.3), '0.3')
+    self.assertEqual(helper.pi_fractions(1), '1')
+    self.assertEqual(helper.pi_fractions(1.0), '1.0')
+    self.assertEqual(helper.pi_fractions(np.array(math.pi / 2)), 'pi/2')
+
 if __name__ == '__main__':
   absltest.main()
@@ -54,6 +54,27 @@ void applyc(cmplx_type *psi, cmplx_type gate[4], int nbits, int ctl, int tgt) {
   }
 }
 
+// mul2x2 multiplies n pairs of 2x2 matrices, out[i] = a[i] @ b[i].
+//
+// As for the gates above, matrices are flattened to 1x4 arrays.
+// For such small matrices, the cost of a numpy matmul is all in
+// dispatch overhead, which is avoided here.
+//
+template <typename cmplx_type>
+void mul2x2(const cmplx_type *a, const cmplx_type *b, cmplx_type *out,
+            int n) {
+  for (int i = 0; i < n; ++i, a += 4, b += 4, out += 4) {
+    cmplx_type t0 = a[0] * b[0] + a[1] * b[2];
+    cmplx_type t1 = a[0] * b[1] + a[1] * b[3];
+    cmplx_type t2 = a[2] * b[0] + a[3] * b[2];
+    cmplx_type t3 = a[2] * b[1] + a[3] * b[3];
+    out[0] = t0;
+    out[1] = t1;
+    out[2] = t2;
+    out[3] = t3;
+  }
+}
+
 // ---------------------------------------------------------------
 // Python wrapper functions to call above accelerators.
 
@@ -124,6 +145,69 @@ static PyObject *applyc_c(PyObject *dummy, PyObject *args) {
   Py_RETURN_NONE;
 }
 
+// Returns false, with a Python exception set, on invalid arguments.
+// The number of matrices n is derived from the size of a. b and out
+// must have the same size, and out must already be a writeable,
+// C-contiguous array of the right type, as results are written to it
+// in place.
+template <typename cmplx_type, int npy_type>
+bool mul2x2_python(PyObject *param_a, PyObject *param_b,
+                   PyObject *param_out) {
+  PyArrayObject *a_arr =
+      (PyArrayObject *)PyArray_FROM_OTF(param_a, npy_type, NPY_IN_ARRAY);
+  PyArrayObject *b_arr =
+      (PyArrayObject *)PyArray_FROM_OTF(param_b, npy_type, NPY_IN_ARRAY);
+  PyArrayObject *out_arr =
+      (PyArrayObject *)PyArray_FROM_OTF(param_out, npy_type, NPY_IN_ARRAY);
+  bool ok = false;
+
+  if (a_arr == NULL || b_arr == NULL || out_arr == NULL) {
+    // Conversion failed, exception is already set.
+  } else if ((PyObject *)out_arr != param_out ||
+             !PyArray_ISWRITEABLE(out_arr)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "mul2x2: out must be a writeable, C-contiguous array "
+                    "of matching complex type");
+  } else if (PyArray_SIZE(a_arr) % 4 != 0 ||
+             PyArray_SIZE(b_arr) != PyArray_SIZE(a_arr) ||
+             PyArray_SIZE(out_arr) != PyArray_SIZE(a_arr)) {
+    PyErr_SetString(PyExc_ValueError,
+                    "mul2x2: a, b, and out must hold the same number "
+                    "of 2x2 matrices");
+  } else {
+    cmplx_type *a = ((cmplx_type *)PyArray_DATA(a_arr));
+    cmplx_type *b = ((cmplx_type *)PyArray_DATA(b_arr));
+    cmplx_type *out = ((cmplx_type *)PyArray_DATA(out_arr));
+    mul2x2<cmplx_type>(a, b, out, PyArray_SIZE(a_arr) / 4);
+    ok = true;
+  }
+
+  Py_XDECREF(a_arr);
+  Py_XDECREF(b_arr);
+  Py_XDECREF(out_arr);
+  return ok;
+}
+
+static PyObject *mul2x2_c(PyObject *dummy, PyObject *args) {
+  PyObject *param_a = NULL;
+  PyObject *param_b = NULL;
+  PyObject *param_out = NULL;
+  int bit_width;
+  bool ok;
+
+  if (!PyArg_ParseTuple(args, "OOOi", &param_a, &param_b, &param_out,
+                        &bit_width))
+    return NULL;
+  if (bit_width == 128) {
+    ok = mul2x2_python<cmplxd, NPY_CDOUBLE>(param_a, param_b, param_out);
+  } else {
+    ok = mul2x2_python<cmplxf, NPY_CFLOAT>(param_a, param_b, param_out);
+  }
+  if (!ok)
+    return NULL;
+  Py_RETURN_NONE;
+}
+
 // ---------------------------------------------------------------
 // Python boilerplate to expose above wrappers to programs.
 //
@@ -132,6 +216,8 @@ static PyMethodDef xgates_methods[] = {
      "Apply single-qubit gate, complex double"},
     {"applyc", applyc_c, METH_VARARGS,
      "Apply controlled qubit gate, complex double"},
+    {"mul2x2", mul2x2_c, METH_VARARGS,
+     "Multiply pairs of 2x2 matrices, complex float or double"},
     {NULL, NULL, 0, NULL}};
 
 static struct PyModuleDef xgates_definition = {
@@ -0,0 +1,47 @@
+# python3
+import numpy as np
+
+from absl.testing import absltest
+
+# Configure: This line might have to change, depending on
+#            the current build environment (see circuit.py).
+import libxgates as xgates
+
+
+class XgatesTest(absltest.TestCase):
+
+  def test_mul2x2(self):
+    for dtype, bit_width in ((np.complex64, 64), (np.complex128, 128)):
+      a = (np.random.random((5, 2, 2)) +
+           1j * np.random.random((5, 2, 2))).astype(dtype)
+      b = (np.random.random((5, 2, 2)) +
+           1j * np.random.random((5, 2, 2))).astype(dtype)
+      out = np.empty((5, 2, 2), dtype=dtype)
+      xgates.mul2x2(a, b, out, bit_width)
+      self.assertTrue(np.allclose(out, np.matmul(a, b), atol=1e-6))
+
+  def test_mul2x2_errors(self):
+    a = np.eye(2, dtype=np.complex128)
+    b = np.eye(2, dtype=np.complex128)
+    out = np.empty((2, 2), dtype=np.complex128)
+
+    # Mismatched sizes.
+    with self.assertRaises(ValueError):
+      xgates.mul2x2(a, np.stack([b, b]), out, 128)
+    with self.assertRaises(ValueError):
+      xgates.mul2x2(a, b, np.empty((2, 2, 2), dtype=np.complex128), 128)
+    with self.assertRaises(ValueError):
+      xgates.mul2x2(a[:, :1], b[:, :1], out[:, :1].copy(), 128)
+
+    # out of wrong type, non-contiguous, or read-only.
+    with self.assertRaises(ValueError):
+      xgates.mul2x2(a, b, out.astype(np.complex64), 128)
+    with self.assertRaises(ValueError):
+      xgates.mul2x2(a, b, np.empty((2, 2), dtype=np.complex128).T, 128)
+    out.flags.writeable = False
+    with self.assertRaises(ValueError):
+      xgates.mul2x2(a, b, out, 128)
+
+
+if __name__ == '__main__':
+  absltest.main()
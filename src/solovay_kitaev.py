@@ -1,63 +1,135 @@
 # python3
 """Example: Solovay-Kitaev Algorithm for gate approximation."""
 
+import cmath
+import functools
 import math
-import random
 
 from absl import app
+from absl import flags
 import numpy as np
 
-from src.lib import helper
 from src.lib import ops
 from src.lib import state
 
+# hnswlib is optional and only needed for --hnsw.
+try:
+  import hnswlib
+except ImportError:
+  hnswlib = None
+
+# The xgates extension (see src/lib/BUILD) is optional. If available,
+# it is used for the many 2x2 matrix products in the SK recursion.
+# Note that bazel py_binary's can't depend on the xgates cc_library, so
+# under 'bazel run' this is only found if libxgates is installed manually.
+try:
+  import libxgates as xgates
+except ImportError:
+  xgates = None
+
+flags.DEFINE_integer('depth', 8, 'Maximum length of base gate sequences')
+flags.DEFINE_bool('hnsw', False, 'Use an HNSW index for the gate search')
+
 
 def to_su2(U):
   """Convert a 2x2 unitary to a unitary with determinant 1.0."""
 
-  return np.sqrt(1 / np.linalg.det(U)) * U
+  # Compute the 2x2 determinant directly instead of via np.linalg.det.
+  # Note that sqrt(1/det) is kept (instead of 1/sqrt(det)), as the two
+  # differ in sign for negative det, eg., for the Hadamard gate.
+  det = U[0, 0] * U[1, 1] - U[0, 1] * U[1, 0]
+  return cmath.sqrt(1 / det) * U
 
 
 def trace_dist(U, V):
-  """Compute trace distance between two 2x2 matrices."""
+  """Compute trace distance between two 2x2 matrices (or stacks of)."""
+
+  # The trace distance is half the sum of the singular values of U - V.
+  # For a 2x2 matrix M, the squared singular values are the roots of
+  #   s^2 - |M|_F^2 s + |det M|^2 = 0,
+  # which needs no matrix square root or eigensolver.
+  #
+  M = np.asarray(U) - np.asarray(V)
+  f = np.sum(np.abs(M)**2, axis=(-2, -1))
+  d = np.abs(M[..., 0, 0] * M[..., 1, 1] - M[..., 0, 1] * M[..., 1, 0])**2
+  s = np.sqrt(np.maximum(f * f - 4 * d, 0.0))
+  return 0.5 * (np.sqrt((f + s) / 2) + np.sqrt(np.maximum((f - s) / 2, 0.0)))
+
 
-  return np.real(0.5 * np.trace(np.sqrt((U - V).adjoint() @ (U - V))))
+def _mul2x2(a, b):
+  """Multiply two 2x2 matrices, via xgates if available."""
+
+  # Both paths compute in, and return, complex128, so that results
+  # do not depend on whether the extension is installed.
+  if xgates is None:
+    return np.matmul(a, b, dtype=np.complex128)
+  out = np.empty((2, 2), dtype=np.complex128)
+  xgates.mul2x2(a, b, out, 128)
+  return out
 
 
 def create_unitaries(base, limit):
   """Create all combinations of all base gates, up to length 'limit'."""
 
-  # Create bitstrings up to bitstring length limit-1:
-  #  0, 1, 00, 01, 10, 11, 000, 001, 010, ...
+  # Enumerate products in bitstring order:
+  #  (), 0, 1, 00, 01, 10, 11, 000, 001, 010, ...
   #
-  # Multiply together the 2 base operators, according to their index.
-  # Note: This can be optimized, by remembering the last 2^x results
-  # and multiplying them with base gets 0, 1.
+  # Instead of recomputing every product from scratch, remember the
+  # products of the previous length and extend each of them with
+  # the base gates 0 and 1. Each extension is a single broadcast
+  # matmul over all products of the previous length.
   #
-  gate_list = []
-  for width in range(limit):
-    for bits in helper.bitprod(width):
-      U = ops.Identity()
-      for bit in bits:
-        U = U @ base[bit]
-      gate_list.append(U)
-  return gate_list
+  prev = np.asarray(ops.Identity())[np.newaxis]
+  gate_list = [prev]
+  for _ in range(limit - 1):
+    prev = np.stack([prev @ np.asarray(gate) for gate in base],
+                    axis=1).reshape(-1, 2, 2)
+    gate_list.append(prev)
+  return np.concatenate(gate_list)
+
 
+def su2_to_vec(U):
+  """Flatten (a stack of) 2x2 matrices into 8 float32 per matrix."""
 
-def find_closest_u(gate_list, u):
-  """Find the one gate in the list closest to u."""
+  U = np.asarray(U)
+  return np.stack([U.real, U.imag], axis=-1).reshape(
+      U.shape[:-2] + (8,)).astype(np.float32)
 
-  # Linear search over list of gates - is _very_ slow.
-  # This can be optimized by using kd-trees.
+
+def build_index(gate_list):
+  """Build an HNSW index over the (N, 2, 2) array of gates."""
+
+  # For SU(2) matrices, U - V is a multiple of an SU(2) matrix, so
+  # both singular values are equal and the Frobenius distance is
+  # monotone in the trace distance. A kd-tree degrades in this
+  # 8-dimensional space, HNSW gives approximate O(log n) queries.
   #
-  min_dist = 10
-  min_u = ops.Identity()
-  for gate in gate_list:
-    tr_dist = trace_dist(gate, u)
-    if tr_dist < min_dist:
-      min_dist = tr_dist
-      min_u = gate
-  return min_u
+  if hnswlib is None:
+    raise app.UsageError('--hnsw requires the hnswlib package.')
+  index = hnswlib.Index(space='l2', dim=8)
+  index.init_index(max_elements=len(gate_list), ef_construction=200, M=16)
+  index.add_items(su2_to_vec(gate_list), np.arange(len(gate_list)))
+  index.set_ef(50)
+  return index
+
+
+def find_closest_u(gate_list, u, index=None):
+  """Find the one gate (ndarray) in the (N, 2, 2) gate array closest to u."""
+
+  # Search in the precision of the gate list, no matter what u is.
+  u = np.ascontiguousarray(u, dtype=gate_list.dtype)
+  if index is not None:
+    labels, _ = index.knn_query(su2_to_vec(u), k=1)
+    idx = labels[0, 0]
+  else:
+    # For SU(2) matrices, the trace distance is sqrt(2 - Re tr(G^dagger u)),
+    # so the closest gate has the largest Re tr(G^dagger u). This is the
+    # dot product of the 8 real components of G and u, computed on a
+    # real view of the gate list, without copying it.
+    real_type = gate_list.real.dtype
+    idx = np.argmax(gate_list.view(real_type).reshape(-1, 8) @
+                    u.view(real_type).reshape(8))
+  return gate_list[idx]
 
 
 def u_to_bloch(U):
@@ -76,11 +148,35 @@ def u_to_bloch(U):
 
 
 def gc_decomp(U):
-  """Group Commutator Decomposition."""
+  """Group Commutator Decomposition, on 2x2 ndarrays."""
 
   def diagonalize(U):
-    _, V = np.linalg.eig(U)
-    return ops.Operator(V)
+    # Closed-form eigenvectors of a 2x2 matrix, from trace and determinant.
+    # For the first eigenvalue lam, both (u01, lam - u00) and
+    # (lam - u11, u10) are eigenvectors (or zero). Pick the numerically
+    # larger one. Since U is normal, the second eigenvector is the
+    # orthogonal complement of the first. This keeps V unitary even if
+    # both eigenvalues are (numerically) equal, eg., for U near identity.
+    u00, u01, u10, u11 = U.ravel().tolist()
+    t = u00 + u11
+    disc = cmath.sqrt(t * t - 4 * (u00 * u11 - u01 * u10))
+    # For SU(2) the radicand is close to the branch cut of sqrt. Fix
+    # the sign of disc, so that eigenvalues of U and of the commutator
+    # are returned in the same order.
+    if disc.imag < 0:
+      disc = -disc
+    lam = (t + disc) / 2
+    x, y = u01, lam - u00
+    if abs(x) + abs(y) < abs(lam - u11) + abs(u10):
+      x, y = lam - u11, u10
+    norm = math.sqrt(abs(x)**2 + abs(y)**2)
+    if norm < 1e-12:
+      # U is (a multiple of) the identity, any basis will do.
+      x, y, norm = 1.0, 0.0, 1.0
+    x, y = x / norm, y / norm
+    V = np.array([[x, -y.conjugate()],
+                  [y, x.conjugate()]])
+    return V
 
   # Because of moderate numerical instability, it can happen
   # that the trace is just a tad over 2.000000. If this happens,
@@ -96,31 +192,64 @@ def gc_decomp(U):
   phi = 2.0 * np.arcsin(np.sqrt(np.sqrt((0.5 - 0.5 * np.cos(theta / 2)))))
 
   axis, _ = u_to_bloch(U)
-  V = ops.RotationX(phi)
+  V = np.asarray(ops.RotationX(phi))
   if axis[2] < 0:
-    W = ops.RotationY(2 * np.pi - phi)
+    W = np.asarray(ops.RotationY(2 * np.pi - phi))
   else:
-    W = ops.RotationY(phi)
+    W = np.asarray(ops.RotationY(phi))
 
   V1 = diagonalize(U)
-  V2 = diagonalize(V @ W @ V.adjoint() @ W.adjoint())
-  S = V1 @ V2.adjoint()
-  V_tilde = S @ V @ S.adjoint()
-  W_tilde = S @ W @ S.adjoint()
+  V2 = diagonalize(V @ W @ V.conj().T @ W.conj().T)
+  S = V1 @ V2.conj().T
+  S_adj = S.conj().T
+  V_tilde = S @ V @ S_adj
+  W_tilde = S @ W @ S_adj
   return V_tilde, W_tilde
 
 
-def sk_algo(U, gates, n):
+def sk_algo(U, gates, n, index=None):
   """Solovay-Kitaev Algorithm."""
 
+  # The recursion runs on raw ndarrays, only the result is
+  # wrapped into an ops.Operator.
+  return ops.Operator(_sk_impl(np.asarray(U), gates, n, index))
+
+
+def _sk_impl(U, gates, n, index):
+  """Solovay-Kitaev Algorithm, recursion on 2x2 ndarrays."""
+
+  # Note: Memoizing this function on (U, n) does not pay off. The
+  # 3^n subproblems are continuous-valued and practically never
+  # repeat, neither within one call nor across random inputs.
+  #
   if n == 0:
-    return find_closest_u(gates, U)
+    return find_closest_u(gates, U, index)
   else:
-    U_next = sk_algo(U, gates, n-1)
-    V, W   = gc_decomp(U @ U_next.adjoint())
-    V_next = sk_algo(V, gates, n-1)
-    W_next = sk_algo(W, gates, n-1)
-    return V_next @ W_next @ V_next.adjoint() @ W_next.adjoint() @ U_next
+    U_next = _sk_impl(U, gates, n-1, index)
+    V, W   = gc_decomp(_mul2x2(U, U_next.conj().T))
+    V_next = _sk_impl(V, gates, n-1, index)
+    W_next = _sk_impl(W, gates, n-1, index)
+    return functools.reduce(_mul2x2, (V_next, W_next, V_next.conj().T,
+                                      W_next.conj().T, U_next))
+
+
+def random_unitaries(num):
+  """Create num random unitaries RotationX @ RotationY @ RotationZ."""
+
+  # Construct all rotations for all experiments in a batch, as
+  # (num, 2, 2) arrays, instead of 3 operators per experiment.
+  a, b, c = 2.0 * np.pi * np.random.random((3, num))
+  ca, sa = np.cos(a / 2), np.sin(a / 2)
+  cb, sb = np.cos(b / 2), np.sin(b / 2)
+  rx = np.empty((num, 2, 2), dtype=complex)
+  rx[:, 0, 0], rx[:, 0, 1] = ca, -1j * sa
+  rx[:, 1, 0], rx[:, 1, 1] = -1j * sa, ca
+  ry = np.empty((num, 2, 2), dtype=complex)
+  ry[:, 0, 0], ry[:, 0, 1] = cb, -sb
+  ry[:, 1, 0], ry[:, 1, 1] = sb, cb
+  rz = np.zeros((num, 2, 2), dtype=complex)
+  rz[:, 0, 0], rz[:, 1, 1] = np.exp(-0.5j * c), np.exp(0.5j * c)
+  return rx @ ry @ rz
 
 
 def main(argv):
@@ -128,20 +257,22 @@ def main(argv):
     raise app.UsageError('Too many command-line arguments.')
 
   num_experiments = 10
-  depth = 8
+  depth = flags.FLAGS.depth
   recursion = 4
   print('SK algorithm - depth: {}, recursion: {}, experiments: {}'.
         format(depth, recursion, num_experiments))
 
   base = [to_su2(ops.Hadamard()), to_su2(ops.Tgate())]
-  gates = create_unitaries(base, depth)
+  # The gate library is only used for a nearest-neighbor search, for
+  # which single precision is plenty. Store it as complex64, independent
+  # of tensor.tensor_type, which halves the memory traffic of the scan.
+  gates = create_unitaries(base, depth).astype(np.complex64)
+  index = build_index(gates) if flags.FLAGS.hnsw else None
   sum_dist = 0.0
-  for i in range(num_experiments):
-      U = (ops.RotationX(2.0 * np.pi * random.random()) @
-           ops.RotationY(2.0 * np.pi * random.random()) @
-           ops.RotationZ(2.0 * np.pi * random.random()))
+  for i, U in enumerate(random_unitaries(num_experiments)):
+      U = ops.Operator(U)
 
-      U_approx = sk_algo(U, gates, recursion)
+      U_approx = sk_algo(U, gates, recursion, index)
 
       dist = trace_dist(U, U_approx)
       sum_dist += dist